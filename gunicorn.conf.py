@@ -0,0 +1,25 @@
+import os
+from threading import Thread
+
+bind = f"0.0.0.0:{os.environ.get('PORT', 80)}"
+worker_class = "gthread"
+# One process on purpose: duplicate suppression, in-flight coalescing, send pacing and the
+# negative caches all live in process memory. The webhook only enqueues, so threads are enough
+workers = 1
+threads = 8
+timeout = 30
+# Room for worker_exit to finish lookups and replies already ACKed to Telegram
+graceful_timeout = 60
+
+# Import main (config, ABI, decoder self-check) in the master, so a bad deploy stops gunicorn at
+# startup instead of leaving it to restart a crashing worker
+preload_app = True
+
+def post_fork(server, worker):
+    import main
+    main.start_dispatcher()
+    Thread(target=main.warm_provider, name="provider-warmup", daemon=True).start()
+
+def worker_exit(server, worker):
+    import main
+    main.shutdown()
\ No newline at end of file
@@ -1,17 +1,34 @@
 import os
-import re
-import json
+import sys
+import html
+import sqlite3
 import logging
+import time
+import heapq
+import orjson
 import requests
 
+from queue import Full, Queue
+from contextlib import closing
+from itertools import count
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from threading import BoundedSemaphore, Condition, Lock, Thread
+from cachetools import TTLCache
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from flask import Flask, request, jsonify
 from telegram import Bot, Update, ParseMode
-from telegram.ext import Dispatcher, CommandHandler, MessageHandler, Filters, CallbackContext
+from telegram.error import RetryAfter
+from telegram.utils.request import Request
+from telegram.ext import Dispatcher, CommandHandler, MessageHandler, MessageFilter, Filters, CallbackContext
 from web3 import Web3
+from web3._utils.abi import get_abi_input_types, map_abi_data, named_tree
+from web3._utils.normalizers import BASE_RETURN_NORMALIZERS
+from eth_utils import function_abi_to_4byte_selector, to_checksum_address
 
 logging.basicConfig(
     format="%(asctime)s - %(levelname)s - %(message)s",
-    level=logging.INFO
+    level=os.environ.get("LOG_LEVEL", "INFO").upper()  # set LOG_LEVEL=WARNING in production
 )
 logger = logging.getLogger(__name__)
 
@@ -19,20 +36,114 @@ TELEGRAM_BOT_TOKEN = os.environ.get("TELEGRAM_BOT_TOKEN")
 API_BASESCAN = os.environ.get("API_BASESCAN")  # e.g. "https://api.basescan.org"
 BASESCAN_API_KEY = os.environ.get("BASESCAN_API_KEY")
 WEBHOOK_URL = os.environ.get("WEBHOOK_URL")        # e.g. "https://get-clank-production.up.railway.app"
-WEB3_PROVIDER_URL = os.environ.get("WEB3_PROVIDER_URL")  # e.g. "https://mainnet.infura.io/v3/YOUR_INFURA_PROJECT_ID"
+WEB3_PROVIDER_URL = os.environ.get("WEB3_PROVIDER_URL")  # Base RPC, e.g. "https://mainnet.base.org"
+# Set FAST_DEPLOY_DECODER=0 to decode every deployToken input through the generic web3 path
+FAST_DEPLOY_DECODER = os.environ.get("FAST_DEPLOY_DECODER", "1") != "0"
 
 if not all([TELEGRAM_BOT_TOKEN, API_BASESCAN, BASESCAN_API_KEY, WEBHOOK_URL, WEB3_PROVIDER_URL]):
     logger.error("❌ Missing environment variables. Please configure TELEGRAM_BOT_TOKEN, API_BASESCAN, BASESCAN_API_KEY, WEBHOOK_URL, WEB3_PROVIDER_URL")
     exit(1)
 
-bot = Bot(token=TELEGRAM_BOT_TOKEN)
-dp = Dispatcher(bot, None, use_context=True)
+DISPATCHER_WORKERS = 32
+# PTB's default Telegram connection pool holds a single connection; size it for every worker
+# and sender thread that may be sending a reply at once, plus the dispatcher and webhook threads
+bot = Bot(token=TELEGRAM_BOT_TOKEN, request=Request(con_pool_size=DISPATCHER_WORKERS + 8))
+# Bounded so a stalled dispatcher thread pushes back on Telegram (503 -> redelivery)
+update_queue = Queue(maxsize=256)
+# The dispatcher thread only matches handlers; run_async lookups then wait in PTB's unbounded
+# internal queue. The webhook takes a slot per address update (released when handle_message
+# finishes) and answers 503 at the cap, so that backlog can't grow without limit
+MAX_PENDING_LOOKUPS = 256
+PENDING_LOOKUPS = BoundedSemaphore(MAX_PENDING_LOOKUPS)
+# Handlers are registered with run_async=True so BaseScan round-trips run on the worker pool
+dp = Dispatcher(bot, update_queue, workers=DISPATCHER_WORKERS, use_context=True)
+
+def run_dispatcher():
+    # dp.start() names its worker threads after the bot's id, which calls getMe; a failure there
+    # would kill the thread for good, so fetch it first and keep retrying until Telegram answers
+    delay = 1
+    while True:
+        try:
+            bot.get_me()
+            break
+        except Exception as e:
+            logger.warning(f"⚠️ getMe failed, retrying dispatcher start in {delay}s: {e}")
+            time.sleep(delay)
+            delay = min(delay * 2, 60)
+    dp.start()
+
+def start_dispatcher():
+    # Dispatcher and send scheduler threads are started per process (gunicorn post_fork hook or
+    # main()), never in a preloading master, since threads don't survive fork
+    Thread(target=run_dispatcher, name="dispatcher", daemon=True).start()
+    Thread(target=run_send_scheduler, name="send-scheduler", daemon=True).start()
+
+# Pooled session for the RPC provider, sized like the dispatcher so concurrent lookups don't
+# queue for a connection; the timeout keeps a stuck RPC from pinning a worker thread
+PROVIDER_SESSION = requests.Session()
+PROVIDER_SESSION.mount("https://", HTTPAdapter(
+    pool_connections=1,
+    pool_maxsize=DISPATCHER_WORKERS,
+    max_retries=Retry(total=2, backoff_factor=0.2)
+))
+w3 = Web3(Web3.HTTPProvider(WEB3_PROVIDER_URL, session=PROVIDER_SESSION, request_kwargs={"timeout": 10}))
+
+# Creation transactions are Base transactions, so the provider is only used when it serves Base
+# (older setups point WEB3_PROVIDER_URL at Ethereum mainnet). Chain id is read once, then kept
+BASE_CHAIN_ID = 8453
+PROVIDER_CHAIN = {"id": None}
+
+def provider_is_base() -> bool:
+    chain_id = PROVIDER_CHAIN["id"]
+    if chain_id is None:
+        with CACHE_LOCK:
+            recently_failed = "chain_id" in PROVIDER_ERROR_CACHE
+        if recently_failed:
+            return False
+        try:
+            # Raw request like get_transaction_from_provider: w3.eth goes through web3's retry
+            # middleware, which would multiply PROVIDER_SESSION's own retries and timeouts
+            chain_id = PROVIDER_CHAIN["id"] = int(w3.provider.make_request("eth_chainId", [])["result"], 16)
+        except Exception as e:
+            logger.warning(f"⚠️ Could not read Web3 provider chain id: {e}")
+            with CACHE_LOCK:
+                PROVIDER_ERROR_CACHE["chain_id"] = True
+            return False
+        if chain_id != BASE_CHAIN_ID:
+            logger.warning(f"⚠️ WEB3_PROVIDER_URL serves chain {chain_id}, not Base ({BASE_CHAIN_ID}); fetching transactions from BaseScan only")
+    return chain_id == BASE_CHAIN_ID
+
+def warm_provider():
+    # Opens the first provider connection (DNS + TLS) and checks its chain ahead of the first user
+    # lookup. Called per process alongside start_dispatcher, so a preloading master never hands
+    # sockets to its workers
+    if provider_is_base():
+        logger.info("🔥 Provider warmed up on Base")
 
-w3 = Web3(Web3.HTTPProvider(WEB3_PROVIDER_URL))
 try:
-    with open("abi.json", "r") as f:
-        abi = json.load(f)
+    with open("abi.json", "rb") as f:
+        full_abi = orjson.loads(f.read())
+    # Names of every ABI function, only used to say what a rejected transaction called
+    FUNCTION_NAMES = {
+        "0x" + function_abi_to_4byte_selector(item).hex(): item["name"]
+        for item in full_abi if item.get("type") == "function"
+    }
+    # deployToken is the only function ever decoded, so the contract is built from just that entry
+    abi = [item for item in full_abi if item.get("type") == "function" and item.get("name") == "deployToken"]
     contract = w3.eth.contract(abi=abi)
+    # Selector -> function lookup table, so decoding doesn't re-hash every ABI entry per call
+    SELECTOR_TO_FUNC = {
+        "0x" + function_abi_to_4byte_selector(fn.abi).hex(): fn
+        for fn in contract.all_functions()
+    }
+    # Input types per selector, decoded with the Web3 instance's codec (built once) instead of
+    # web3's decode_transaction_data, which constructs a fresh ABICodec on every call
+    SELECTOR_TO_INPUT_TYPES = {
+        selector: get_abi_input_types(fn.abi) for selector, fn in SELECTOR_TO_FUNC.items()
+    }
+    CODEC = w3.codec
+    DEPLOY_TOKEN_FUNC = contract.get_function_by_name("deployToken")
+    DEPLOY_TOKEN_SELECTOR = "0x" + function_abi_to_4byte_selector(DEPLOY_TOKEN_FUNC.abi).hex()
     logger.info("✅ ABI loaded successfully.")
 except Exception as e:
     logger.error(f"❌ Error loading ABI: {e}")
@@ -40,178 +151,665 @@ except Exception as e:
 
 app = Flask(__name__)
 
-# Dictionary for mapping addresses to labels
-ADDRESS_LABELS = {
+# Shared HTTP session so BaseScan calls reuse pooled keep-alive connections
+SESSION = requests.Session()
+SESSION.mount("https://", HTTPAdapter(
+    pool_connections=16,
+    pool_maxsize=64,
+    max_retries=Retry(total=3, backoff_factor=0.2, status_forcelist=[429, 500, 502, 503, 504])
+))
+SESSION.headers.update({"Accept": "application/json", "Accept-Encoding": "gzip"})
+# (connect, read): an unreachable BaseScan fails in 3s instead of holding a worker for the full 10s
+BASESCAN_TIMEOUT = (3, 10)
+# Fixed query parameters for the two BaseScan calls; only the address/txhash is added per request
+BASESCAN_URL = f"{API_BASESCAN}/api"
+CREATION_PARAMS = {"module": "contract", "action": "getcontractcreation", "apikey": BASESCAN_API_KEY}
+TX_PARAMS = {"module": "proxy", "action": "eth_getTransactionByHash", "apikey": BASESCAN_API_KEY}
+
+# Contract creation data is immutable, so successful lookups are cached for a day
+CACHE_TTL = 86400
+TXHASH_CACHE = TTLCache(maxsize=4096, ttl=CACHE_TTL)      # contract address -> creation txhash
+TX_DATA_CACHE = TTLCache(maxsize=4096, ttl=CACHE_TTL)     # txhash -> transaction data (TX_FIELDS only)
+TX_FIELDS = ("from", "input")
+DECODED_CACHE = TTLCache(maxsize=4096, ttl=CACHE_TTL)     # contract address -> decoded input
+NOT_DEPLOY_TOKEN_CACHE = TTLCache(maxsize=10000, ttl=CACHE_TTL)  # contract address -> why its creation tx was rejected
+# Addresses BaseScan had no creation record for (EOAs, typos, not-yet-indexed contracts); kept
+# briefly so repeated junk input doesn't cost a BaseScan call each time. Short, because tokens
+# are usually looked up seconds after deployment, before BaseScan has indexed them
+NO_CREATION_TTL = 60
+NO_CREATION_CACHE = TTLCache(maxsize=10000, ttl=NO_CREATION_TTL)  # contract address -> True
+# Failed creation lookups (HTTP errors, rate-limit/error responses, timeouts), held off for a few
+# seconds so users retrying the same address during an outage don't each wait out the timeouts
+CREATION_ERROR_TTL = 30
+CREATION_ERROR_CACHE = TTLCache(maxsize=1024, ttl=CREATION_ERROR_TTL)  # contract address -> True
+# A failed provider chain id read, so an unreachable provider isn't probed on every lookup
+PROVIDER_ERROR_CACHE = TTLCache(maxsize=1, ttl=CREATION_ERROR_TTL)  # "chain_id" -> True
+CACHE_LOCK = Lock()
+
+# Write-through SQLite copy of the lookups above, so they survive restarts and redeploys. Rows
+# (tx_data holds full deployToken calldata) are pruned by age and count at startup and every
+# PERSISTENT_CACHE_PRUNE_EVERY writes, so the file can't grow for as long as the bot runs
+CACHE_DB_PATH = os.environ.get("CACHE_DB_PATH", "tx_cache.sqlite3")
+PERSISTENT_CACHE_MAX_AGE = 30 * 86400
+PERSISTENT_CACHE_MAX_ROWS = 10000  # per table
+PERSISTENT_CACHE_PRUNE_EVERY = 500
+PERSISTENT_CACHE_TABLES = ("creation_txhash", "tx_data")
+PERSISTENT_CACHE_WRITES = count(1)
+
+# (chat id, lowercase contract address) pairs seen recently, to drop the copies Telegram delivers
+# when the same message is echoed from several of a user's clients
+DUPLICATE_WINDOW = 5
+RECENT_REQUESTS = TTLCache(maxsize=10000, ttl=DUPLICATE_WINDOW)
+
+# Lookups currently in progress, keyed by lowercase contract address
+INFLIGHT = {}
+INFLIGHT_LOCK = Lock()
+INFLIGHT_TIMEOUT = 15
+
+# Dictionary for mapping addresses to labels; keys are lowercased once here so entries
+# can be pasted in any (e.g. checksummed) case and lookups only lowercase the sender
+ADDRESS_LABELS = {address.lower(): label for address, label in {
     "0x2112b8456ac07c15fa31ddf3bf713e77716ff3f9": "bnkr deployer",
     "0xd9acd656a5f1b519c9e76a2a6092265a74186e58": "clanker interface"
-}
+}.items()}
+
+# HTML rather than Markdown: values are escaped with html.escape, so names or addresses
+# containing "_", "*" or "`" can't break the message
+REPLY_TEMPLATE = (
+    "<b>Token Deployment Information:</b>\n\n"
+    "<b>From:</b> <code>{display_from}</code>\n"
+    "<b>Name:</b> <code>{name}</code>\n"
+    "<b>Symbol:</b> <code>{symbol}</code>\n"
+    "<b>Image:</b> <a href=\"{image}\">Link</a>\n\n"
+    "<b>Context:</b>\n{context}\n\n"
+    "<b>Creator Reward Recipient:</b> <code>{creator_reward_recipient}</code>"
+)
+
+# Telegram rejects longer messages; over-long replies move the long fields into a document
+TELEGRAM_MESSAGE_LIMIT = 4096
+DETAILS_FILENAME = "token_details.txt"
+# Raw characters of name/symbol/image kept in the reply when even the context-less reply is too long;
+# at most 6x after html.escape, so three of them plus the template stay under the limit
+MAX_FIELD_PREVIEW = 100
+
+HEX_DIGITS = frozenset("0123456789abcdefABCDEF")
+
+def is_contract_address(text: str) -> bool:
+    # Fixed-length hex check; cheaper than running the regex engine on every message
+    return len(text) == 42 and text.startswith("0x") and HEX_DIGITS.issuperset(text[2:])
+
+def open_cache_db():
+    # A short-lived connection per call: sqlite connections must not cross threads or forks
+    return closing(sqlite3.connect(CACHE_DB_PATH, timeout=5))
+
+def init_cache_db():
+    try:
+        with open_cache_db() as conn, conn:
+            conn.execute("CREATE TABLE IF NOT EXISTS creation_txhash (address TEXT PRIMARY KEY, txhash TEXT NOT NULL, created_at INTEGER NOT NULL DEFAULT 0)")
+            conn.execute("CREATE TABLE IF NOT EXISTS tx_data (txhash TEXT PRIMARY KEY, data BLOB NOT NULL, created_at INTEGER NOT NULL DEFAULT 0)")
+            # Files written before rows were timestamped; their rows count as oldest and are pruned first
+            for table in PERSISTENT_CACHE_TABLES:
+                columns = {row[1] for row in conn.execute(f"PRAGMA table_info({table})")}
+                if "created_at" not in columns:
+                    conn.execute(f"ALTER TABLE {table} ADD COLUMN created_at INTEGER NOT NULL DEFAULT 0")
+    except Exception as e:
+        logger.warning(f"⚠️ Persistent cache unavailable: {e}")
+        return
+    prune_cache_db()
+
+def prune_cache_db():
+    try:
+        with open_cache_db() as conn, conn:
+            for table in PERSISTENT_CACHE_TABLES:
+                conn.execute(f"DELETE FROM {table} WHERE created_at < ?", (int(time.time()) - PERSISTENT_CACHE_MAX_AGE,))
+                conn.execute(
+                    f"DELETE FROM {table} WHERE rowid NOT IN "
+                    f"(SELECT rowid FROM {table} ORDER BY created_at DESC, rowid DESC LIMIT ?)",
+                    (PERSISTENT_CACHE_MAX_ROWS,)
+                )
+    except Exception as e:
+        logger.warning(f"⚠️ Error pruning persistent cache: {e}")
+
+def persistent_cache_get(table: str, key_column: str, value_column: str, key: str):
+    try:
+        with open_cache_db() as conn:
+            row = conn.execute(f"SELECT {value_column} FROM {table} WHERE {key_column} = ?", (key,)).fetchone()
+        return row[0] if row else None
+    except Exception as e:
+        logger.warning(f"⚠️ Error reading persistent cache: {e}")
+        return None
+
+def persistent_cache_put(table: str, key_column: str, value_column: str, key: str, value):
+    try:
+        with open_cache_db() as conn, conn:
+            conn.execute(
+                f"INSERT OR REPLACE INTO {table} ({key_column}, {value_column}, created_at) VALUES (?, ?, ?)",
+                (key, value, int(time.time()))
+            )
+    except Exception as e:
+        logger.warning(f"⚠️ Error writing persistent cache: {e}")
+        return
+    if next(PERSISTENT_CACHE_WRITES) % PERSISTENT_CACHE_PRUNE_EVERY == 0:
+        prune_cache_db()
+
+init_cache_db()
+
+def remember_creation_failure(cache: TTLCache, cache_key: str):
+    with CACHE_LOCK:
+        cache[cache_key] = True
 
 def get_creation_txhash(contract_address: str) -> str:
+    cache_key = contract_address.lower()
+    with CACHE_LOCK:
+        cached = TXHASH_CACHE.get(cache_key)
+        no_creation = cache_key in NO_CREATION_CACHE
+        recently_failed = cache_key in CREATION_ERROR_CACHE
+    if cached:
+        logger.info("⚡ Using cached txhash for contract %s", contract_address)
+        return cached
+    if no_creation:
+        logger.info("⚡ BaseScan recently had no creation record for %s", contract_address)
+        return None
+    if recently_failed:
+        logger.info("⚡ Creation lookup for %s failed moments ago, not retrying yet", contract_address)
+        return None
+    cached = persistent_cache_get("creation_txhash", "address", "txhash", cache_key)
+    if cached:
+        logger.info("⚡ Using persisted txhash for contract %s", contract_address)
+        with CACHE_LOCK:
+            TXHASH_CACHE[cache_key] = cached
+        return cached
     try:
-        logger.info(f"🔍 Getting creation txhash from BaseScan for contract {contract_address}")
-        url = f"{API_BASESCAN}/api"
-        params = {
-            "module": "contract",
-            "action": "getcontractcreation",
-            "contractaddresses": contract_address,
-            "apikey": BASESCAN_API_KEY
-        }
-        resp = requests.get(url, params=params, timeout=10)
-        data = resp.json()
+        logger.info("🔍 Getting creation txhash from BaseScan for contract %s", contract_address)
+        params = {**CREATION_PARAMS, "contractaddresses": contract_address}
+        resp = SESSION.get(BASESCAN_URL, params=params, timeout=BASESCAN_TIMEOUT)
+        # Checked before parsing: error pages needn't be JSON, and an error body must not be
+        # mistaken for a missing creation record
+        if resp.status_code != 200:
+            logger.error(f"❌ BaseScan returned HTTP {resp.status_code} for contract {contract_address}")
+            remember_creation_failure(CREATION_ERROR_CACHE, cache_key)
+            return None
+        data = orjson.loads(resp.content)
         results = data.get("result", [])
         if not results or not isinstance(results, list):
             logger.error(f"❌ No result for contract {contract_address}")
+            # An empty result means no creation record; error strings (rate limit, bad key) are transient
+            remember_creation_failure(CREATION_ERROR_CACHE if results else NO_CREATION_CACHE, cache_key)
             return None
         txhash = results[0].get("txHash")
-        logger.info(f"✅ Found txhash: {txhash}")
+        logger.info("✅ Found txhash: %s", txhash)
+        if txhash:
+            with CACHE_LOCK:
+                TXHASH_CACHE[cache_key] = txhash
+            persistent_cache_put("creation_txhash", "address", "txhash", cache_key, txhash)
         return txhash
     except Exception as e:
         logger.error(f"❌ Error fetching txhash: {e}")
+        remember_creation_failure(CREATION_ERROR_CACHE, cache_key)
         return None
 
+def get_transaction_from_provider(txhash: str) -> dict:
+    try:
+        logger.info("📦 Fetching transaction data from Web3 provider for txhash: %s", txhash)
+        # Raw JSON-RPC result has the same shape as BaseScan's proxy response
+        data = w3.provider.make_request("eth_getTransactionByHash", [txhash])
+        result = data.get("result")
+        if not result or not isinstance(result, dict):
+            logger.warning(f"⚠️ Web3 provider returned no transaction for txhash: {txhash}")
+            return {}
+        logger.info("✅ Transaction data retrieved from Web3 provider.")
+        return result
+    except Exception as e:
+        logger.warning(f"⚠️ Error fetching transaction data from Web3 provider: {e}")
+        return {}
+
+def cache_transaction_data(txhash: str, result: dict) -> dict:
+    # Keep only the fields the handler reads, so cached entries don't carry signature/gas/block data
+    result = {field: result.get(field) for field in TX_FIELDS}
+    with CACHE_LOCK:
+        TX_DATA_CACHE[txhash] = result
+    persistent_cache_put("tx_data", "txhash", "data", txhash, orjson.dumps(result))
+    return result
+
 def get_transaction_data(txhash: str) -> dict:
+    with CACHE_LOCK:
+        cached = TX_DATA_CACHE.get(txhash)
+    if cached:
+        logger.info("⚡ Using cached transaction data for txhash: %s", txhash)
+        return cached
+    persisted = persistent_cache_get("tx_data", "txhash", "data", txhash)
+    if persisted:
+        logger.info("⚡ Using persisted transaction data for txhash: %s", txhash)
+        result = orjson.loads(persisted)
+        with CACHE_LOCK:
+            TX_DATA_CACHE[txhash] = result
+        return result
+    # Prefer the node we already hold a connection to; BaseScan's proxy is the fallback
+    result = get_transaction_from_provider(txhash) if provider_is_base() else {}
+    if result:
+        return cache_transaction_data(txhash, result)
     try:
-        logger.info(f"📦 Fetching transaction data for txhash: {txhash}")
-        url = f"{API_BASESCAN}/api"
-        params = {
-            "module": "proxy",
-            "action": "eth_getTransactionByHash",
-            "txhash": txhash,
-            "apikey": BASESCAN_API_KEY
-        }
-        resp = requests.get(url, params=params, timeout=10)
-        data = resp.json()
+        logger.info("📦 Fetching transaction data for txhash: %s", txhash)
+        params = {**TX_PARAMS, "txhash": txhash}
+        resp = SESSION.get(BASESCAN_URL, params=params, timeout=BASESCAN_TIMEOUT)
+        if resp.status_code != 200:
+            logger.error(f"❌ BaseScan returned HTTP {resp.status_code} for txhash: {txhash}")
+            return {}
+        data = orjson.loads(resp.content)
         logger.info("✅ Transaction data retrieved.")
-        return data.get("result", {})
+        result = data.get("result", {})
+        if not result or not isinstance(result, dict):
+            logger.error(f"❌ No transaction in BaseScan response for txhash: {txhash}")
+            return {}
+        return cache_transaction_data(txhash, result)
     except Exception as e:
         logger.error(f"❌ Error fetching transaction data: {e}")
         return {}
 
-def decode_input_with_web3(input_hex: str):
+def read_abi_word(data: bytes, pos: int) -> int:
+    if pos < 0 or pos + 32 > len(data):
+        raise ValueError(f"ABI word at {pos} is out of bounds")
+    return int.from_bytes(data[pos:pos + 32], "big")
+
+def read_abi_string(data: bytes, pos: int) -> str:
+    length = read_abi_word(data, pos)
+    if pos + 32 + length > len(data):
+        raise ValueError(f"ABI string at {pos} is out of bounds")
+    return data[pos + 32:pos + 32 + length].decode("utf-8")
+
+def decode_deploy_token_input(data: bytes):
+    # Reads only the fields shown in the reply straight from the deployToken calldata layout:
+    #   deploymentConfig = (tokenConfig, vaultConfig[2], poolConfig[2], initialBuyConfig[2], rewardsConfig[5])
+    #   tokenConfig = (name, symbol, salt, image, metadata, context, originatingChainId)
+    try:
+        config_pos = read_abi_word(data, 0)
+        token_pos = config_pos + read_abi_word(data, config_pos)
+        # Head words 1-6 are the static vault/pool/initial-buy tuples; rewardsConfig starts at word 7
+        recipient_word = read_abi_word(data, config_pos + 32 * 9)
+        token_config = {
+            field: read_abi_string(data, token_pos + read_abi_word(data, token_pos + 32 * index))
+            for index, field in ((0, "name"), (1, "symbol"), (3, "image"), (5, "context"))
+        }
+        rewards_config = {"creatorRewardRecipient": to_checksum_address(recipient_word.to_bytes(32, "big")[12:])}
+        return {
+            "function": "deployToken",
+            "args": {"deploymentConfig": {"tokenConfig": token_config, "rewardsConfig": rewards_config}}
+        }
+    except Exception as e:
+        logger.warning(f"⚠️ Fast deployToken decode failed, falling back to Web3: {e}")
+        return None
+
+def decode_input_with_web3(selector: str, data: bytes):
     try:
         logger.info("🔓 Decoding input data with Web3...")
-        func_obj, func_args = contract.decode_function_input(input_hex)
-        logger.info(f"✅ Decoded function: {func_obj.fn_name}")
+        func_obj = SELECTOR_TO_FUNC.get(selector)
+        if func_obj is None:
+            logger.error(f"❌ Unknown function selector: {selector}")
+            return None
+        input_types = SELECTOR_TO_INPUT_TYPES[selector]
+        decoded = CODEC.decode(input_types, data)
+        decoded = map_abi_data(BASE_RETURN_NORMALIZERS, input_types, decoded)
+        func_args = named_tree(func_obj.abi["inputs"], decoded)
+        logger.info("✅ Decoded function: %s", func_obj.fn_name)
         return {"function": func_obj.fn_name, "args": func_args}
     except Exception as e:
         logger.error(f"❌ Error decoding input: {e}")
         return None
 
-def handle_message(update: Update, context: CallbackContext):
+# Argument types decode_deploy_token_input's hand-coded offsets assume
+DEPLOY_TOKEN_INPUT_TYPES = [
+    "((string,string,bytes32,string,string,string,uint256),(uint8,uint256),(address,int24),"
+    "(uint24,uint256),(uint256,address,address,address,address))"
+]
+
+def check_fast_deploy_decoder():
+    # Run at import: the fast reader must match abi.json's deployToken layout and agree with the
+    # Web3 decoder on a fully encoded call, otherwise it would silently return the wrong fields
+    if SELECTOR_TO_INPUT_TYPES[DEPLOY_TOKEN_SELECTOR] != DEPLOY_TOKEN_INPUT_TYPES:
+        raise ValueError(f"deployToken input types changed: {SELECTOR_TO_INPUT_TYPES[DEPLOY_TOKEN_SELECTOR]}")
+    addresses = [to_checksum_address(f"0x{digit * 40}") for digit in "123456"]
+    sample = ((
+        ("Name", "SYM", b"\x01" * 32, "https://image", '{"meta":1}', '{"interface":"check"}', 8453),
+        (7, 8), (addresses[0], -9), (10, 11), (12, addresses[1], addresses[2], addresses[3], addresses[4]),
+    ),)
+    data = CODEC.encode(DEPLOY_TOKEN_INPUT_TYPES, sample)
+    fast = decode_deploy_token_input(data)
+    full = decode_input_with_web3(DEPLOY_TOKEN_SELECTOR, data)
+    if not fast or not full:
+        raise ValueError("deployToken sample could not be decoded")
+    for section, fields in fast["args"]["deploymentConfig"].items():
+        for field, value in fields.items():
+            if full["args"]["deploymentConfig"][section][field] != value:
+                raise ValueError(f"fast decoder disagrees with Web3 on {section}.{field}")
+
+if FAST_DEPLOY_DECODER:
     try:
-        msg_text = update.message.text.strip()
-        logger.info(f"📨 Received message: {msg_text}")
-
-        if not re.match(r"^0x[a-fA-F0-9]{40}$", msg_text):
-            logger.warning("⚠️ Message is not a valid contract address.")
-            return
-
-        update.message.reply_text(f"Processing contract: `{msg_text}`", parse_mode=ParseMode.MARKDOWN)
-        txhash = get_creation_txhash(msg_text)
-        if not txhash:
-            update.message.reply_text("Could not find txhash from BaseScan.")
-            return
-
-        tx_data = get_transaction_data(txhash)
-        if not tx_data:
-            update.message.reply_text("Failed to retrieve transaction data from BaseScan.")
-            return
-
-        from_address = tx_data.get("from", "")
-        if not from_address:
-            update.message.reply_text("No 'from' address found in the transaction.")
-            return
-
-        # Check if from_address has a label
-        label = ADDRESS_LABELS.get(from_address.lower())
-        if label:
-            display_from = f"{label} ({from_address})"
-        else:
-            display_from = from_address
-
-        input_data_raw = tx_data.get("input", "")
-        if not input_data_raw:
-            update.message.reply_text("No input data found in the transaction.")
-            return
+        check_fast_deploy_decoder()
+    except Exception as e:
+        logger.error(f"❌ Fast deployToken decoder doesn't match abi.json ({e}); update decode_deploy_token_input or set FAST_DEPLOY_DECODER=0")
+        exit(1)
 
-        logger.info(f"🔍 Input data raw (first 20 chars): {input_data_raw[:20]}... (length: {len(input_data_raw)})")
-        decoded = decode_input_with_web3(input_data_raw)
+# Raised with a user-facing message when a contract can't be resolved to a token deployment
+class DeploymentLookupError(Exception):
+    pass
+
+def reject_contract(cache_key: str, rejection: str) -> DeploymentLookupError:
+    # A contract's creation tx never changes, so a rejection based on it is remembered
+    with CACHE_LOCK:
+        NOT_DEPLOY_TOKEN_CACHE[cache_key] = rejection
+    return DeploymentLookupError(rejection)
+
+def build_deployment_reply(contract_address: str) -> tuple:
+    cache_key = contract_address.lower()
+    with CACHE_LOCK:
+        rejection = NOT_DEPLOY_TOKEN_CACHE.get(cache_key)
+    if rejection:
+        logger.info("⚡ Contract %s is known not to be a deployToken deployment", contract_address)
+        raise DeploymentLookupError(rejection)
+
+    txhash = get_creation_txhash(contract_address)
+    if not txhash:
+        raise DeploymentLookupError("Could not find txhash from BaseScan.")
+
+    tx_data = get_transaction_data(txhash)
+    if not tx_data:
+        raise DeploymentLookupError("Failed to retrieve transaction data from BaseScan.")
+
+    from_address = tx_data.get("from", "")
+    if not from_address:
+        raise reject_contract(cache_key, "No 'from' address found in the transaction.")
+
+    # Check if from_address has a label
+    label = ADDRESS_LABELS.get(from_address.lower())
+    display_from = from_address if label is None else f"{label} ({from_address})"
+
+    input_data_raw = tx_data.get("input", "")
+    if not input_data_raw:
+        raise reject_contract(cache_key, "No input data found in the transaction.")
+
+    logger.debug("🔍 Input data raw len=%d head=%s", len(input_data_raw), input_data_raw[:64])
+    # Compare the 4-byte function selector before paying for a full ABI decode
+    selector = input_data_raw[:10].lower()
+    if selector != DEPLOY_TOKEN_SELECTOR:
+        function_name = FUNCTION_NAMES.get(selector, f"unknown selector {input_data_raw[:10]}")
+        raise reject_contract(cache_key, f"This is not a deployToken transaction (function: {function_name}).")
+
+    with CACHE_LOCK:
+        decoded = DECODED_CACHE.get(cache_key)
+    if not decoded:
+        # Convert the argument bytes after the selector once and share them between both decoders
+        try:
+            input_args = bytes.fromhex(input_data_raw[10:])
+        except ValueError as e:
+            logger.error(f"❌ Input data is not valid hex: {e}")
+            raise reject_contract(cache_key, "Error decoding input data.")
+        decoded = decode_deploy_token_input(input_args) if FAST_DEPLOY_DECODER else None
         if not decoded:
-            update.message.reply_text("Error decoding input data.")
-            return
+            decoded = decode_input_with_web3(selector, input_args)
+        if not decoded:
+            raise reject_contract(cache_key, "Error decoding input data.")
+        with CACHE_LOCK:
+            DECODED_CACHE[cache_key] = decoded
+
+    if decoded.get("function") != "deployToken":
+        raise reject_contract(cache_key, f"This is not a deployToken transaction (function: {decoded.get('function')}).")
+
+    deployment_config = decoded.get("args", {}).get("deploymentConfig")
+    if not deployment_config:
+        raise reject_contract(cache_key, "deploymentConfig not found in the input data.")
+
+    token_config = deployment_config.get("tokenConfig", {})
+    rewards_config = deployment_config.get("rewardsConfig", {})
+
+    name = token_config.get("name")
+    symbol = token_config.get("symbol")
+    # Add '$' prefix for symbol if not already present
+    if symbol and not symbol.startswith("$"):
+        symbol = f"${symbol}"
+    image = token_config.get("image")
+    # chain_id is removed from output as per update requirement
+    creator_reward_recipient = rewards_config.get("creatorRewardRecipient")
+
+    # Process context: each key-value on a new line; if key is "messageId", show as hyperlink; skip "id" line from context display.
+    context_raw = token_config.get("context")
+    try:
+        context_json = orjson.loads(context_raw)
+    except Exception as e:
+        logger.warning(f"⚠️ Failed to parse context JSON: {e}")
+        context_json = {"context": context_raw}
+
+    if type(context_json) is dict:
+        # Single pass: skip 'id' and empty values (only strings need the whitespace check)
+        context_formatted = "\n".join(
+            f'{html.escape(key)}: <a href="{html.escape(str(value))}">Link</a>' if key == "messageId"
+            else f"{html.escape(key)}: {html.escape(str(value))}"
+            for key, value in context_json.items()
+            if key != "id" and value and (type(value) is not str or value.strip())
+        )
+    else:
+        context_formatted = html.escape(str(context_json))
+
+    fields = {
+        "display_from": html.escape(display_from),
+        "name": html.escape(str(name)),
+        "symbol": html.escape(str(symbol)),
+        "image": html.escape(str(image)),
+        "context": context_formatted,
+        "creator_reward_recipient": html.escape(str(creator_reward_recipient)),
+    }
+    reply = REPLY_TEMPLATE.format_map(fields)
+    if len(reply) <= TELEGRAM_MESSAGE_LIMIT:
+        return reply, None
+    # Context, name, symbol and image are free-form on-chain text; rather than split HTML across
+    # messages, leave the context out (then shorten the rest if needed) and attach the full values
+    fields["context"] = f"<i>Too long to show, see {DETAILS_FILENAME}</i>"
+    reply = REPLY_TEMPLATE.format_map(fields)
+    if len(reply) > TELEGRAM_MESSAGE_LIMIT:
+        for key, value in (("name", name), ("symbol", symbol), ("image", image)):
+            value = str(value)
+            if len(value) > MAX_FIELD_PREVIEW:
+                value = value[:MAX_FIELD_PREVIEW] + "…"
+            fields[key] = html.escape(value)
+        reply = REPLY_TEMPLATE.format_map(fields)
+    details = f"Name: {name}\nSymbol: {symbol}\nImage: {image}\n\nContext:\n{context_raw}\n"
+    return reply, details.encode("utf-8")
+
+def get_deployment_reply(contract_address: str) -> tuple:
+    # Coalesce concurrent requests for the same contract onto a single lookup
+    cache_key = contract_address.lower()
+    with INFLIGHT_LOCK:
+        future = INFLIGHT.get(cache_key)
+        is_owner = future is None
+        if is_owner:
+            future = Future()
+            INFLIGHT[cache_key] = future
+    if not is_owner:
+        logger.info("⏳ Waiting for in-flight lookup of contract %s", contract_address)
+        try:
+            return future.result(timeout=INFLIGHT_TIMEOUT)
+        except FutureTimeoutError:
+            # The owner's lookup can outlast the wait (BaseScan retries, then provider and proxy fallbacks)
+            logger.warning(f"⚠️ Timed out waiting for in-flight lookup of contract {contract_address}")
+            raise DeploymentLookupError("Lookup for this contract is still in progress, try again shortly.")
 
-        if decoded.get("function") != "deployToken":
-            update.message.reply_text(f"This is not a deployToken transaction (function: {decoded.get('function')}).")
+    try:
+        future.set_result(build_deployment_reply(contract_address))
+    except Exception as e:
+        future.set_exception(e)
+    finally:
+        with INFLIGHT_LOCK:
+            INFLIGHT.pop(cache_key, None)
+    return future.result()
+
+# Telegram limits bots to ~30 messages/s overall and ~1 message/s per chat (short bursts tolerated).
+# The buckets are per process; gunicorn runs a single worker (see gunicorn.conf.py)
+class TokenBucket:
+    def __init__(self, rate: float, capacity: int):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def refill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def reserve(self, now: float) -> float:
+        # Takes a token, letting the balance go negative so waiting callers are spaced out,
+        # and returns how long the caller must wait before using it
+        self.refill(now)
+        self.tokens -= 1
+        return 0.0 if self.tokens >= 0 else -self.tokens / self.rate
+
+GLOBAL_SEND_BUCKET = TokenBucket(rate=30, capacity=30)
+# A burst of 3 covers "Processing..." plus the result. A bucket is only dropped once it has fully
+# refilled (identical to a fresh one); one in deficit still has sends queued against it
+CHAT_SEND_BUCKETS = {}  # chat id -> TokenBucket
+CHAT_BUCKET_PRUNE_INTERVAL = 60
+LAST_BUCKET_PRUNE = {"at": time.monotonic()}
+SEND_LOCK = Lock()
+
+def prune_chat_buckets(now: float):
+    # Caller holds SEND_LOCK
+    for chat_id, bucket in list(CHAT_SEND_BUCKETS.items()):
+        bucket.refill(now)
+        if bucket.tokens >= bucket.capacity:
+            del CHAT_SEND_BUCKETS[chat_id]
+    LAST_BUCKET_PRUNE["at"] = now
+
+# Sends that have to wait for their slot are queued here and delivered by a scheduler thread and a
+# few sender threads, so dispatcher workers never sleep on a busy chat
+SENDER_THREADS = 4
+SEND_EXECUTOR = ThreadPoolExecutor(max_workers=SENDER_THREADS, thread_name_prefix="sender")
+SEND_SCHEDULE = []  # heap of (due monotonic time, sequence number, chat id, send, kwargs, retried)
+SEND_SCHEDULED = Condition(SEND_LOCK)
+SEND_SEQUENCE = count()
+
+def schedule_send(due: float, chat_id, send, kwargs: dict, retried: bool):
+    # Caller holds SEND_LOCK
+    heapq.heappush(SEND_SCHEDULE, (due, next(SEND_SEQUENCE), chat_id, send, kwargs, retried))
+    SEND_SCHEDULED.notify()
+
+def run_send_scheduler():
+    with SEND_SCHEDULED:
+        while True:
+            if not SEND_SCHEDULE:
+                SEND_SCHEDULED.wait()
+                continue
+            wait = SEND_SCHEDULE[0][0] - time.monotonic()
+            if wait > 0:
+                SEND_SCHEDULED.wait(wait)
+                continue
+            _, _, chat_id, send, kwargs, retried = heapq.heappop(SEND_SCHEDULE)
+            SEND_EXECUTOR.submit(deliver, chat_id, send, kwargs, retried)
+
+def deliver(chat_id, send, kwargs: dict, retried: bool = False):
+    try:
+        send(**kwargs)
+    except RetryAfter as e:
+        if retried:
+            logger.error(f"❌ Telegram flood limit hit again in chat {chat_id}, dropping message")
             return
-
-        deployment_config = decoded.get("args", {}).get("deploymentConfig")
-        if not deployment_config:
-            update.message.reply_text("deploymentConfig not found in the input data.")
+        logger.warning(f"⚠️ Telegram flood limit hit in chat {chat_id}, retrying in {e.retry_after}s")
+        with SEND_LOCK:
+            schedule_send(time.monotonic() + e.retry_after, chat_id, send, kwargs, True)
+    except Exception as e:
+        logger.exception(f"❌ Error sending message to chat {chat_id}: {e}")
+
+def send_paced(chat_id, send, optional: bool = False, **kwargs):
+    # Sends right away when both buckets have a token, otherwise hands the message to the
+    # scheduler. Optional messages are dropped instead of queued when they would have to wait
+    with SEND_LOCK:
+        now = time.monotonic()
+        if now - LAST_BUCKET_PRUNE["at"] > CHAT_BUCKET_PRUNE_INTERVAL:
+            prune_chat_buckets(now)
+        chat_bucket = CHAT_SEND_BUCKETS.get(chat_id)
+        if chat_bucket is None:
+            chat_bucket = CHAT_SEND_BUCKETS[chat_id] = TokenBucket(rate=1, capacity=3)
+        if optional:
+            GLOBAL_SEND_BUCKET.refill(now)
+            chat_bucket.refill(now)
+            if GLOBAL_SEND_BUCKET.tokens < 1 or chat_bucket.tokens < 1:
+                logger.info("⏭️ Skipping optional message to busy chat %s", chat_id)
+                return
+        delay = max(GLOBAL_SEND_BUCKET.reserve(now), chat_bucket.reserve(now))
+        if delay:
+            schedule_send(now + delay, chat_id, send, kwargs, False)
             return
+    deliver(chat_id, send, kwargs)
 
-        token_config = deployment_config.get("tokenConfig", {})
-        rewards_config = deployment_config.get("rewardsConfig", {})
+def send_reply(message, text: str, optional: bool = False, **kwargs):
+    send_paced(message.chat_id, message.reply_text, optional=optional, text=text, **kwargs)
 
-        name = token_config.get("name")
-        symbol = token_config.get("symbol")
-        # Add '$' prefix for symbol if not already present
-        if symbol and not symbol.startswith("$"):
-            symbol = f"${symbol}"
-        image = token_config.get("image")
-        # chain_id is removed from output as per update requirement
-        creator_reward_recipient = rewards_config.get("creatorRewardRecipient")
+def handle_message(update: Update, context: CallbackContext):
+    try:
+        # Only contract addresses reach this handler (see ContractAddressFilter)
+        msg_text = update.message.text.strip()
+        logger.info("📨 Received message: %s", msg_text)
+
+        request_key = (update.message.chat_id, msg_text.lower())
+        with CACHE_LOCK:
+            is_duplicate = request_key in RECENT_REQUESTS
+            RECENT_REQUESTS[request_key] = True
+        if is_duplicate:
+            logger.info("⏭️ Ignoring duplicate request for %s in chat %s", msg_text, update.message.chat_id)
+            return
 
-        # Process context: each key-value on a new line; if key is "messageId", show as hyperlink; skip "id" line from context display.
-        context_raw = token_config.get("context")
+        # Only an acknowledgement, so it is skipped rather than queued when the chat is busy
+        send_reply(update.message, f"Processing contract: <code>{msg_text}</code>", optional=True, parse_mode=ParseMode.HTML, disable_web_page_preview=True)
         try:
-            context_json = json.loads(context_raw)
-        except Exception as e:
-            logger.warning(f"⚠️ Failed to parse context JSON: {e}")
-            context_json = {"context": context_raw}
-
-        context_lines = []
-        if isinstance(context_json, dict):
-            for key, value in context_json.items():
-                if value and str(value).strip():
-                    if key == "messageId":
-                        context_lines.append(f"{key}: [Link]({value})")
-                    elif key == "id":
-                        # Skip displaying 'id' in context
-                        continue
-                    else:
-                        context_lines.append(f"{key}: {value}")
-        else:
-            context_lines.append(str(context_json))
-        context_formatted = "\n".join(context_lines)
-
-        reply = (
-            f"*Token Deployment Information:*\n\n"
-            f"*From:* `{display_from}`\n"
-            f"*Name:* `{name}`\n"
-            f"*Symbol:* `{symbol}`\n"
-            f"*Image:* [Link]({image})\n\n"
-            f"*Context:*\n{context_formatted}\n\n"
-            f"*Creator Reward Recipient:* `{creator_reward_recipient}`"
-        )
+            reply, details_file = get_deployment_reply(msg_text)
+        except DeploymentLookupError as e:
+            send_reply(update.message, str(e), disable_web_page_preview=True)
+            return
 
-        update.message.reply_text(reply, parse_mode=ParseMode.MARKDOWN)
+        # No link previews: Telegram would otherwise fetch the image/message URLs before delivering
+        send_reply(update.message, reply, parse_mode=ParseMode.HTML, disable_web_page_preview=True)
+        if details_file is not None:
+            send_paced(update.message.chat_id, update.message.reply_document, document=details_file, filename=DETAILS_FILENAME)
         logger.info("✅ Bot has responded successfully.")
     except Exception as e:
         logger.exception(f"❌ Unhandled error in handle_message: {e}")
+    finally:
+        PENDING_LOOKUPS.release()
 
 def start_command(update: Update, context: CallbackContext):
-    update.message.reply_text("Bot is ready. Please send a token contract address to process.")
+    send_reply(update.message, "Bot is ready. Please send a token contract address to process.", disable_web_page_preview=True)
 
-dp.add_handler(CommandHandler("start", start_command))
-dp.add_handler(MessageHandler(Filters.text & ~Filters.command, handle_message))
+# Rejects chat noise inside the dispatcher, before a worker thread is spent on handle_message
+class ContractAddressFilter(MessageFilter):
+    def filter(self, message):
+        return bool(message.text) and is_contract_address(message.text.strip())
+
+ADDRESS_HANDLER = MessageHandler(Filters.text & ~Filters.command & ContractAddressFilter(), handle_message, run_async=True)
+dp.add_handler(CommandHandler("start", start_command, run_async=True))
+dp.add_handler(ADDRESS_HANDLER)
 
 @app.route(f"/{TELEGRAM_BOT_TOKEN}", methods=["POST"])
 def telegram_webhook():
     try:
-        data = request.get_json(force=True)
-        logger.info(f"📨 Received update from Telegram: {data}")
+        data = orjson.loads(request.get_data())
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("📨 Received update from Telegram: %s", data)
+        # Never ACK an update no dispatcher will process; Telegram redelivers after a 503
+        if not dp.running:
+            logger.warning("⚠️ Dispatcher is not running, asking Telegram to redeliver later.")
+            return jsonify({"ok": False}), 503
         update_obj = Update.de_json(data, bot)
-        dp.process_update(update_obj)
+        # Same check the dispatcher makes; only these updates become lookups
+        is_lookup = bool(ADDRESS_HANDLER.check_update(update_obj))
+        if is_lookup and not PENDING_LOOKUPS.acquire(blocking=False):
+            logger.warning("⚠️ Too many lookups pending, asking Telegram to redeliver later.")
+            return jsonify({"ok": False}), 503
+        # Hand off to the dispatcher thread and ACK right away, so Telegram's request never
+        # waits on handler work and doesn't retry the delivery
+        try:
+            update_queue.put_nowait(update_obj)
+        except Full:
+            if is_lookup:
+                PENDING_LOOKUPS.release()
+            logger.warning("⚠️ Update queue is full, asking Telegram to redeliver later.")
+            return jsonify({"ok": False}), 503
         return jsonify({"ok": True})
     except Exception as e:
         logger.exception(f"❌ Error processing webhook: {e}")
@@ -221,17 +819,49 @@ def telegram_webhook():
 def index():
     return "🤖 Clanker Bot is running (Flask webhook)."
 
-def main():
+def set_webhook():
     bot.delete_webhook(drop_pending_updates=True)
     hook_url = f"{WEBHOOK_URL}/{TELEGRAM_BOT_TOKEN}"
-    if not bot.set_webhook(url=hook_url):
+    # Let Telegram deliver up to 40 updates concurrently; gunicorn ACKs them without waiting on handlers
+    if not bot.set_webhook(url=hook_url, max_connections=40):
         logger.error("❌ Failed to set webhook with Telegram.")
         exit(1)
     logger.info(f"✅ Webhook has been set: {hook_url}")
 
+# Longest a shutdown waits for queued replies whose send slot hasn't come up yet
+SEND_DRAIN_TIMEOUT = 20
+
+def shutdown():
+    # Updates are ACKed before they are processed, so finish what Telegram already counts as
+    # delivered: dp.stop() drains update_queue and PTB's async queue, then queued sends go out
+    logger.info("🛑 Stopping dispatcher and draining pending lookups...")
+    dp.stop()
+    deadline = time.monotonic() + SEND_DRAIN_TIMEOUT
+    with SEND_SCHEDULED:
+        while SEND_SCHEDULE and time.monotonic() < deadline:
+            SEND_SCHEDULED.wait(0.2)
+        dropped = len(SEND_SCHEDULE)
+    SEND_EXECUTOR.shutdown(wait=True)
+    if dropped:
+        logger.warning(f"⚠️ Shut down with {dropped} paced replies still unsent")
+    logger.info("✅ Shutdown complete.")
+
+def main():
+    # Local/dev entry point; production runs `main:app` under gunicorn (see gunicorn.conf.py)
+    set_webhook()
+    start_dispatcher()
+    Thread(target=warm_provider, name="provider-warmup", daemon=True).start()
+
     port = int(os.environ.get("PORT", 80))
     logger.info(f"🚀 Starting Flask server on port {port}...")
-    app.run(host="0.0.0.0", port=port)
+    try:
+        app.run(host="0.0.0.0", port=port)
+    finally:
+        shutdown()
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    # `python main.py --set-webhook` registers the webhook once before gunicorn starts its workers
+    if "--set-webhook" in sys.argv[1:]:
+        set_webhook()
+    else:
+        main()
\ No newline at end of file